@@ -1,202 +1,280 @@
 import streamlit as st
 from PIL import Image, ImageDraw, ImageFont
+import numpy as np
+import functools
 import io
+import math
+import unicodedata
 
 ########################################
 # Fonctions utilitaires
 ########################################
 
+@st.cache_resource
 def load_font(font_size, bold=False):
     """
     Charge une police TrueType située à la racine du projet,
     en utilisant DejaVuSans (ou DejaVuSans-Bold).
+    La mise en page basique suffit pour du texte latin (entrées normalisées
+    en NFC) et évite le coût de Raqm.
     """
     try:
         if bold:
-            return ImageFont.truetype("DejaVuSans-Bold.ttf", font_size)
+            return ImageFont.truetype("DejaVuSans-Bold.ttf", font_size,
+                                      layout_engine=ImageFont.Layout.BASIC)
         else:
-            return ImageFont.truetype("DejaVuSans.ttf", font_size)
+            return ImageFont.truetype("DejaVuSans.ttf", font_size,
+                                      layout_engine=ImageFont.Layout.BASIC)
     except Exception as e:
         print("Erreur lors du chargement de la police :", e)
         return ImageFont.load_default()
 
 def get_line_height(font, line_spacing=0):
-    ascent, descent = font.getmetrics()
-    return ascent + descent + line_spacing
+    # ascent + descent est mémorisé sur l'objet police au premier appel
+    ad = getattr(font, "_ad", None)
+    if ad is None:
+        ascent, descent = font.getmetrics()
+        ad = font._ad = ascent + descent
+    return ad + line_spacing
+
+# Cache des largeurs mesurées (clé : (id(font), texte)),
+# vidé à chaque génération de fiche.
+_WIDTH_CACHE = {}
+
+def _cw(draw, font, s, cache=_WIDTH_CACHE):
+    """
+    Renvoie la largeur en pixels (arrondie à l'entier) de `s`, en évitant de
+    relancer draw.textlength pour un texte déjà mesuré avec la même police.
+    """
+    key = (id(font), s)
+    width = cache.get(key)
+    if width is None:
+        width = round(draw.textlength(s, font=font))
+        cache[key] = width
+    return width
 
 def split_long_word(word, draw, font, max_width):
-    segments = []
-    current_segment = ""
-    current_width = 0
-
-    for char in word:
-        char_width = draw.textlength(char, font=font)
-        if current_width + char_width <= max_width:
-            current_segment += char
-            current_width += char_width
-        else:
-            segments.append(current_segment)
-            current_segment = char
-            current_width = char_width
+    """
+    Découpe un mot trop long en segments tenant dans max_width,
+    en cherchant la position de coupure par dichotomie.
+    """
+    if _cw(draw, font, word) <= max_width:
+        return [word]
 
-    if current_segment:
-        segments.append(current_segment)
+    segments = []
+    start = 0
+
+    while start < len(word):
+        # Au moins un caractère par segment, même s'il dépasse.
+        lo, hi = start + 1, len(word)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if _cw(draw, font, word[start:mid]) <= max_width:
+                lo = mid
+            else:
+                hi = mid - 1
+        segments.append(word[start:lo])
+        start = lo
 
     return segments
 
 def wrap_text_by_pixels(draw, text, font, max_width):
+    if not text:
+        return []
+
     words = text.split()
     lines = []
-    current_line = ""
-    current_width = 0
+    # Mots de la ligne en cours, assemblés une seule fois au passage à la ligne
+    buf = []
+    buf_w = 0
+    space_width = _cw(draw, font, " ")
 
     for w in words:
-        w_test = w + " "
-        w_width = draw.textlength(w_test, font=font)
+        w_width = _cw(draw, font, w) + space_width
 
         if w_width > max_width:
-            if current_line:
-                lines.append(current_line.rstrip())
-                current_line = ""
-                current_width = 0
-            sub_parts = split_long_word(w, draw, font, max_width)
-            for part in sub_parts:
-                lines.append(part)
+            if buf:
+                lines.append(" ".join(buf))
+                buf = []
+                buf_w = 0
+            lines.extend(split_long_word(w, draw, font, max_width))
         else:
-            if current_width + w_width <= max_width:
-                current_line += w + " "
-                current_width += w_width
+            if buf_w + w_width <= max_width:
+                buf.append(w)
+                buf_w += w_width
             else:
-                lines.append(current_line.rstrip())
-                current_line = w + " "
-                current_width = w_width
+                lines.append(" ".join(buf))
+                buf = [w]
+                buf_w = w_width
 
-    if current_line.strip():
-        lines.append(current_line.rstrip())
+    if buf:
+        lines.append(" ".join(buf))
 
     return lines
 
-def get_text_bubble_height(draw, text, font, bubble_width, margin, line_spacing):
+@functools.lru_cache(maxsize=None)
+def corner_masks(radius):
+    """
+    Masques "L" des quatre coins arrondis d'une bulle de rayon `radius`
+    (haut-gauche, haut-droit, bas-gauche, bas-droit), rastérisés une seule fois.
+    """
+    top_left = Image.new("L", (radius + 1, radius + 1), 0)
+    ImageDraw.Draw(top_left).pieslice((0, 0, radius * 2, radius * 2), 180, 270, fill=255)
+    top_right = top_left.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+    bottom_left = top_left.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+    bottom_right = top_right.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+    return top_left, top_right, bottom_left, bottom_right
+
+def draw_bubble(image, draw, box, radius, color):
+    """
+    Fond de bulle arrondi : deux rectangles pour la partie droite,
+    puis les coins en cache collés aux quatre angles.
+    """
+    # Coordonnées arrondies comme le fait Pillow
+    x0, y0, x1, y1 = (round(v) for v in box)
+    # Coins qui se rejoignent : rendu particulier de rounded_rectangle
+    if radius <= 0 or 2 * radius >= min(x1 - x0, y1 - y0) - 1:
+        draw.rounded_rectangle(box, radius=radius, fill=color)
+        return
+
+    r = radius
+    draw.rectangle((x0 + r + 1, y0, x1 - r - 1, y1), fill=color)
+    draw.rectangle((x0, y0 + r + 1, x1, y1 - r - 1), fill=color)
+    top_left, top_right, bottom_left, bottom_right = corner_masks(r)
+    image.paste(color, (x0, y0), top_left)
+    image.paste(color, (x1 - r, y0), top_right)
+    image.paste(color, (x0, y1 - r), bottom_left)
+    image.paste(color, (x1 - r, y1 - r), bottom_right)
+
+def new_text_mask(bubble_width, total_height):
+    """
+    Crée un masque "L" aux dimensions de la bulle : le texte y est rastérisé,
+    puis collé sur la fiche avec image.paste(couleur, position, masque).
+    """
+    mask = Image.new("L", (int(bubble_width) + 1, math.ceil(total_height) + 1), 0)
+    return mask, ImageDraw.Draw(mask)
+
+def layout_text_bubble(draw, text, font, bubble_width, margin, line_spacing):
+    """
+    Découpe le texte en lignes et calcule la hauteur de la bulle.
+    Renvoie (lines, total_height), à passer tel quel à render_text_bubble.
+    """
     max_text_width = bubble_width - 2 * margin
     lines = wrap_text_by_pixels(draw, text, font, max_text_width)
     line_h = get_line_height(font, line_spacing)
     total_text_height = len(lines) * line_h
-    return margin + total_text_height + margin
+    total_height = margin + total_text_height + margin
+    return lines, total_height
 
-def draw_text_bubble(draw, text, x, y, bubble_width,
-                     text_font, text_color,
-                     bubble_color, corner_radius,
-                     margin, line_spacing):
-    max_text_width = bubble_width - 2 * margin
-    lines = wrap_text_by_pixels(draw, text, text_font, max_text_width)
+def render_text_bubble(image, draw, layout, x, y, bubble_width,
+                       text_font, text_color,
+                       bubble_color, corner_radius,
+                       margin, line_spacing):
+    lines, total_height = layout
     line_h = get_line_height(text_font, line_spacing)
-    total_text_height = len(lines) * line_h
-    total_height = margin + total_text_height + margin
 
-    draw.rounded_rectangle((x, y, x + bubble_width, y + total_height),
-                           radius=corner_radius, fill=bubble_color)
+    draw_bubble(image, draw, (x, y, x + bubble_width, y + total_height),
+                corner_radius, bubble_color)
 
-    current_y = y + margin
+    # Position entière pour le collage, partie fractionnaire reportée dans le masque
+    x0, y0 = int(x), int(y)
+    mask, mdraw = new_text_mask(bubble_width, total_height)
+    current_y = y - y0 + margin
     for line in lines:
-        draw.text((x + margin, current_y), line, font=text_font, fill=text_color)
+        mdraw.text((x - x0 + margin, current_y), line, font=text_font, fill=255)
         current_y += line_h
+    image.paste(text_color, (x0, y0), mask)
 
     return y + total_height + 10
 
-def draw_label_and_content(draw, label, content,
-                           x, y, bubble_width,
-                           label_font, content_font,
-                           label_color, content_color,
-                           bubble_color, corner_radius,
-                           margin, label_content_gap,
-                           line_spacing):
-    max_text_width = bubble_width - 2 * margin
-
+def layout_label_and_content(draw, label, content, max_text_width,
+                             label_font, content_font,
+                             label_line_height, content_line_height,
+                             margin, label_content_gap):
+    """
+    Découpe le titre de section et son contenu en lignes et calcule la hauteur
+    de la bulle. Renvoie (label_lines, content_lines, total_height).
+    La largeur utile et les hauteurs de ligne, identiques pour toutes les
+    bulles, sont calculées une fois par l'appelant.
+    """
     label_lines = wrap_text_by_pixels(draw, label, label_font, max_text_width)
     content_lines = wrap_text_by_pixels(draw, content, content_font, max_text_width)
 
-    label_line_height = get_line_height(label_font, line_spacing)
-    content_line_height = get_line_height(content_font, line_spacing)
-
     label_height_total = len(label_lines) * label_line_height
     content_height_total = len(content_lines) * content_line_height
 
     total_height = margin + label_height_total + label_content_gap + content_height_total + margin
+    return label_lines, content_lines, total_height
 
-    draw.rounded_rectangle((x, y, x + bubble_width, y + total_height),
-                           radius=corner_radius, fill=bubble_color)
+def render_label_and_content(image, draw, layout,
+                             x, y, bubble_width,
+                             label_font, content_font,
+                             label_color, content_color,
+                             bubble_color, corner_radius,
+                             label_line_height, content_line_height,
+                             margin, label_content_gap):
+    label_lines, content_lines, total_height = layout
 
-    current_y = y + margin
+    draw_bubble(image, draw, (x, y, x + bubble_width, y + total_height),
+                corner_radius, bubble_color)
+
+    # Position entière pour le collage, partie fractionnaire reportée dans le masque
+    x0, y0 = int(x), int(y)
+    mask, mdraw = new_text_mask(bubble_width, total_height)
+
+    current_y = y - y0 + margin
     for line in label_lines:
-        draw.text((x + margin, current_y), line, font=label_font, fill=label_color)
+        mdraw.text((x - x0 + margin, current_y), line, font=label_font, fill=255)
         current_y += label_line_height
+    if content_color != label_color:
+        image.paste(label_color, (x0, y0), mask)
+        mask, mdraw = new_text_mask(bubble_width, total_height)
 
     current_y += label_content_gap
     for line in content_lines:
-        draw.text((x + margin, current_y), line, font=content_font, fill=content_color)
+        mdraw.text((x - x0 + margin, current_y), line, font=content_font, fill=255)
         current_y += content_line_height
+    image.paste(content_color, (x0, y0), mask)
 
     return y + total_height + 10
 
+def load_bird_image(image_bytes, size):
+    """
+    Décode l'image importée et la redimensionne à `size`.
+    Renvoie un tableau NumPy RGB, conservé d'une exécution à l'autre.
+    """
+    img_w, img_h = size
+    bird_img = Image.open(io.BytesIO(image_bytes))
+    # Pour un JPEG, décode directement à échelle réduite (sans effet pour un PNG)
+    bird_img.draft("RGB", (img_w * 2, img_h * 2))
+    bird_img = bird_img.convert("RGB")
+    if bird_img.width > img_w * 2 and bird_img.height > img_h * 2:
+        bird_img = bird_img.resize((img_w * 2, img_h * 2), Image.BILINEAR)
+    bird_img = bird_img.resize((img_w, img_h), Image.LANCZOS)
+    return np.asarray(bird_img)
+
 ########################################
-# Interface Streamlit
+# Génération de la fiche
 ########################################
 
-st.set_page_config(page_title="Fiche d'oiseau", layout="centered")
-st.title("🐦 Bienvenue Mélanie")
-st.subheader("Crée une fiche personnalisée pour chaque oiseau")
-
-st.markdown("---")
-col1, col2 = st.columns(2)
-
-with col1:
-    fiche_num = st.text_input("Numéro de fiche", placeholder="Ex : 1")
-    nom = st.text_input("Nom de l'oiseau", placeholder="Ex : Rougegorge familier")
-    nom_sci = st.text_input("Nom scientifique", placeholder="Ex : Erithacus rubecula")
-    dimensions = st.text_input("Dimensions", placeholder="Ex : 14 cm / 18 grammes")
-    habitat = st.text_input("Habitat", placeholder="Ex : Jardin, haies, sous-bois")
-    alimentation = st.text_input("Alimentation", placeholder="Ex : Insectes, graines, fruits")
-
-with col2:
-    comportement = st.text_input("Comportement", placeholder="Ex : Solitaire, territorial")
-    trait = st.text_input("Trait particulier", placeholder="Ex : Tache orange sur le torse")
-    confusion = st.text_input("Risques de confusion", placeholder="Ex : Rougequeue, bouvreuil")
-    texte = st.text_area("Texte explicatif", placeholder="Décris son comportement, son chant, sa relation avec l'humain...")
-    image = st.file_uploader("Image de l'oiseau", type=["jpg", "jpeg", "png"])
-
-soft_styles_dict = {
-    "Carnet": ((250, 245, 235), (195, 215, 180), (210, 230, 200), (50, 50, 50)),
-    "Classique": ((255, 255, 255), (130, 190, 240), (255, 170, 80), (40, 40, 40)),
-    "Ludique": ((255, 250, 235), (255, 200, 80), (130, 200, 255), (60, 60, 60)),
-    "Épuré": ((245, 245, 245), (220, 220, 220), (235, 235, 235), (30, 30, 30)),
-    "Douceur": ((255, 250, 255), (240, 210, 230), (250, 235, 245), (80, 40, 70)),
-    "Automne": ((255, 250, 240), (190, 150, 100), (230, 190, 150), (60, 40, 30))
-}
+BIRD_IMG_SIZE = (320, 280)
 
-style = st.selectbox("Choix du style de fiche :", [
-    "🌿 Carnet naturaliste (beige & vert pastel)",
-    "📘 Classique (bleu & orange)",
-    "🎨 Ludique & coloré",
-    "⬜ Épuré moderne (gris clair)",
-    "🌸 Douceur florale (rose poudré & lavande)",
-    "🍂 Automne vintage (ocre & brun)"
-])
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def render_fiche(inputs_tuple, style_key, font_sizes, spacing_opts, bird_arr):
+    """
+    Dessine la fiche complète et renvoie l'image encodée en JPEG.
+    Mise en cache sur l'ensemble des paramètres : régénérer une fiche
+    identique renvoie directement les octets déjà calculés. Le cache est borné
+    (32 fiches, une heure) pour ne pas grossir indéfiniment sur un serveur partagé.
+    """
+    (fiche_num, nom, nom_sci, dimensions, habitat,
+     alimentation, comportement, trait, confusion, texte) = inputs_tuple
+    titre_taille, etiquette_taille, texte_taille = font_sizes
+    line_spacing, corner_radius, margin_bulle, label_content_gap = spacing_opts
 
-with st.expander("⚙️ Options de police avancées"):
-    titre_taille = st.slider("Taille du titre principal", 30, 80, 56)
-    etiquette_taille = st.slider("Taille des titres de section", 16, 36, 22)
-    texte_taille = st.slider("Taille du texte général", 14, 30, 18)
-    line_spacing = st.slider("Espacement entre lignes", 0, 20, 5)
-    corner_radius = st.slider("Arrondi des bulles", 0, 50, 20)
-    margin_bulle = st.slider("Marge interne (padding) des bulles", 5, 30, 10)
-    label_content_gap = st.slider("Espace entre le titre de section et le texte", 5, 50, 10)
+    _WIDTH_CACHE.clear()
 
-if st.button("🎨 Générer la fiche") and nom:
-    fond, accent, bande, texte_couleur = soft_styles_dict["Carnet"]
-    for key in soft_styles_dict:
-        if key in style:
-            fond, accent, bande, texte_couleur = soft_styles_dict[key]
-            break
+    fond, accent, bande, texte_couleur = soft_styles_dict[style_key]
 
     width, height = 1000, 1400
     fiche = Image.new("RGB", (width, height), fond)
@@ -209,10 +287,7 @@ if st.button("🎨 Générer la fiche") and nom:
     num_font = load_font(20, bold=False)
 
     title_text = nom.upper()
-    title_bbox = draw.textbbox((0, 0), title_text, font=titre_font)
-    title_w = title_bbox[2] - title_bbox[0]
-    title_x = (width - title_w) // 2
-    draw.text((title_x, 60), title_text, font=titre_font, fill=texte_couleur)
+    draw.text((width // 2, 60), title_text, font=titre_font, fill=texte_couleur, anchor="ma")
 
     circle_left, circle_top = width - 90, 40
     circle_right, circle_bottom = width - 40, 90
@@ -220,24 +295,17 @@ if st.button("🎨 Générer la fiche") and nom:
 
     circle_center_x = (circle_left + circle_right) // 2
     circle_center_y = (circle_top + circle_bottom) // 2
-    num_bbox = draw.textbbox((0, 0), fiche_num, font=num_font)
-    num_w = num_bbox[2] - num_bbox[0]
-    num_h = num_bbox[3] - num_bbox[1]
-    text_x = circle_center_x - num_w / 2
-    text_y = circle_center_y - num_h / 2
-    draw.text((text_x, text_y), fiche_num, font=num_font, fill=(0, 0, 0))
+    draw.text((circle_center_x, circle_center_y), fiche_num, font=num_font, fill=(0, 0, 0), anchor="mm")
 
     y = 150
 
-    img_w, img_h = 320, 280
+    img_w, img_h = BIRD_IMG_SIZE
     img_x = width - img_w - 60
     img_y = y
-    if image:
+    if bird_arr is not None:
         draw.rounded_rectangle((img_x - 8, img_y - 8, img_x + img_w + 8, img_y + img_h + 8),
                                radius=corner_radius, fill=fond, outline=accent, width=3)
-        bird_img = Image.open(image).convert("RGB")
-        bird_img = bird_img.resize((img_w, img_h), Image.LANCZOS)
-        fiche.paste(bird_img, (img_x, img_y))
+        fiche.paste(Image.fromarray(bird_arr), (img_x, img_y))
 
     info_x_end = img_x - 30
     bubble_width = info_x_end - 60
@@ -252,11 +320,29 @@ if st.button("🎨 Générer la fiche") and nom:
         ("Confusions", confusion),
     ]
 
+    max_text_width = bubble_width - 2 * margin_bulle
+    label_lh = get_line_height(etiquette_font, line_spacing)
+    content_lh = get_line_height(contenu_font, line_spacing)
+
     for label, content in infos:
-        y = draw_label_and_content(
+        if not content.strip():
+            continue
+        layout = layout_label_and_content(
             draw=draw,
             label=label,
             content=content,
+            max_text_width=max_text_width,
+            label_font=etiquette_font,
+            content_font=contenu_font,
+            label_line_height=label_lh,
+            content_line_height=content_lh,
+            margin=margin_bulle,
+            label_content_gap=label_content_gap
+        )
+        y = render_label_and_content(
+            image=fiche,
+            draw=draw,
+            layout=layout,
             x=60, y=y,
             bubble_width=bubble_width,
             label_font=etiquette_font,
@@ -265,14 +351,16 @@ if st.button("🎨 Générer la fiche") and nom:
             content_color=texte_couleur,
             bubble_color=bande,
             corner_radius=corner_radius,
+            label_line_height=label_lh,
+            content_line_height=content_lh,
             margin=margin_bulle,
-            label_content_gap=label_content_gap,
-            line_spacing=line_spacing
+            label_content_gap=label_content_gap
         )
 
     y = max(y, img_y + img_h + 60)
     large_width = width - 120
-    bubble_height = get_text_bubble_height(draw, texte, contenu_font, large_width, margin_bulle, line_spacing)
+    texte_layout = layout_text_bubble(draw, texte, contenu_font, large_width, margin_bulle, line_spacing)
+    bubble_height = texte_layout[1]
     bottom_margin_for_frise = 50
     space_for_bubble = (height - bottom_margin_for_frise) - y
 
@@ -282,9 +370,10 @@ if st.button("🎨 Générer la fiche") and nom:
     else:
         final_y = y
 
-    y = draw_text_bubble(
+    y = render_text_bubble(
+        image=fiche,
         draw=draw,
-        text=texte,
+        layout=texte_layout,
         x=60, y=final_y,
         bubble_width=large_width,
         text_font=contenu_font,
@@ -297,13 +386,105 @@ if st.button("🎨 Générer la fiche") and nom:
 
     frise_y = height - 50
     draw.line((80, frise_y, width - 80, frise_y), fill=accent, width=3)
+    # Un seul arc rastérisé, collé ensuite tout le long de la frise
+    arc_tile = Image.new("RGBA", (31, 41), (0, 0, 0, 0))
+    ImageDraw.Draw(arc_tile).arc((0, 0, 30, 40), start=0, end=180, fill=accent, width=2)
     for i in range(80, width - 80, 30):
-        draw.arc((i, frise_y - 10, i + 30, frise_y + 30), start=0, end=180, fill=accent, width=2)
+        fiche.paste(arc_tile, (i, frise_y - 10), arc_tile)
 
+    # Un seul encodage JPEG, partagé entre l'aperçu et le téléchargement
     buffer = io.BytesIO()
-    fiche.save(buffer, format="JPEG")
-    st.image(fiche, caption="Fiche générée")
+    fiche.save(buffer, format="JPEG", quality=85, subsampling=2, optimize=False)
+    return buffer.getvalue()
+
+########################################
+# Interface Streamlit
+########################################
+
+st.set_page_config(page_title="Fiche d'oiseau", layout="centered")
+st.title("🐦 Bienvenue Mélanie")
+st.subheader("Crée une fiche personnalisée pour chaque oiseau")
+
+st.markdown("---")
+col1, col2 = st.columns(2)
+
+with col1:
+    fiche_num = st.text_input("Numéro de fiche", placeholder="Ex : 1")
+    nom = st.text_input("Nom de l'oiseau", placeholder="Ex : Rougegorge familier")
+    nom_sci = st.text_input("Nom scientifique", placeholder="Ex : Erithacus rubecula")
+    dimensions = st.text_input("Dimensions", placeholder="Ex : 14 cm / 18 grammes")
+    habitat = st.text_input("Habitat", placeholder="Ex : Jardin, haies, sous-bois")
+    alimentation = st.text_input("Alimentation", placeholder="Ex : Insectes, graines, fruits")
+
+with col2:
+    comportement = st.text_input("Comportement", placeholder="Ex : Solitaire, territorial")
+    trait = st.text_input("Trait particulier", placeholder="Ex : Tache orange sur le torse")
+    confusion = st.text_input("Risques de confusion", placeholder="Ex : Rougequeue, bouvreuil")
+    texte = st.text_area("Texte explicatif", placeholder="Décris son comportement, son chant, sa relation avec l'humain...")
+    image = st.file_uploader("Image de l'oiseau", type=["jpg", "jpeg", "png"])
+
+soft_styles_dict = {
+    "Carnet": ((250, 245, 235), (195, 215, 180), (210, 230, 200), (50, 50, 50)),
+    "Classique": ((255, 255, 255), (130, 190, 240), (255, 170, 80), (40, 40, 40)),
+    "Ludique": ((255, 250, 235), (255, 200, 80), (130, 200, 255), (60, 60, 60)),
+    "Épuré": ((245, 245, 245), (220, 220, 220), (235, 235, 235), (30, 30, 30)),
+    "Douceur": ((255, 250, 255), (240, 210, 230), (250, 235, 245), (80, 40, 70)),
+    "Automne": ((255, 250, 240), (190, 150, 100), (230, 190, 150), (60, 40, 30))
+}
+
+# L'emoji en tête de chaque libellé identifie le style correspondant
+STYLE_LOOKUP = {
+    "🌿": "Carnet",
+    "📘": "Classique",
+    "🎨": "Ludique",
+    "⬜": "Épuré",
+    "🌸": "Douceur",
+    "🍂": "Automne"
+}
+
+style_options = [
+    "🌿 Carnet naturaliste (beige & vert pastel)",
+    "📘 Classique (bleu & orange)",
+    "🎨 Ludique & coloré",
+    "⬜ Épuré moderne (gris clair)",
+    "🌸 Douceur florale (rose poudré & lavande)",
+    "🍂 Automne vintage (ocre & brun)"
+]
+
+style = st.selectbox("Choix du style de fiche :", style_options)
+
+with st.expander("⚙️ Options de police avancées"):
+    titre_taille = st.slider("Taille du titre principal", 30, 80, 56)
+    etiquette_taille = st.slider("Taille des titres de section", 16, 36, 22)
+    texte_taille = st.slider("Taille du texte général", 14, 30, 18)
+    line_spacing = st.slider("Espacement entre lignes", 0, 20, 5)
+    corner_radius = st.slider("Arrondi des bulles", 0, 50, 20)
+    margin_bulle = st.slider("Marge interne (padding) des bulles", 5, 30, 10)
+    label_content_gap = st.slider("Espace entre le titre de section et le texte", 5, 50, 10)
+
+# L'image n'est décodée et redimensionnée qu'à chaque nouvel import
+bird_arr = None
+if image:
+    image_bytes = image.getvalue()
+    img_key = hash(image_bytes)
+    if st.session_state.get("img_key") != img_key:
+        st.session_state.img_key = img_key
+        st.session_state.img_arr = load_bird_image(image_bytes, BIRD_IMG_SIZE)
+    bird_arr = st.session_state.img_arr
+
+if st.button("🎨 Générer la fiche") and nom:
+    # Accents composés en un seul caractère pour la mise en page basique
+    jpeg_bytes = render_fiche(
+        tuple(unicodedata.normalize("NFC", champ) for champ in (
+            fiche_num, nom, nom_sci, dimensions, habitat,
+            alimentation, comportement, trait, confusion, texte)),
+        STYLE_LOOKUP.get(style[0], "Carnet"),
+        (titre_taille, etiquette_taille, texte_taille),
+        (line_spacing, corner_radius, margin_bulle, label_content_gap),
+        bird_arr
+    )
+    st.image(jpeg_bytes, caption="Fiche générée")
     st.download_button("📥 Télécharger la fiche JPEG",
-                       buffer.getvalue(),
+                       jpeg_bytes,
                        file_name=f"fiche_{nom.lower().replace(' ', '_')}.jpeg",
                        mime="image/jpeg")